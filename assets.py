@@ -0,0 +1,91 @@
+import os, sys, time
+import pygame
+import atlas, pack
+
+# Every image, sound and font the game uses, decoded once per process on first use and then shared
+# by all snakes, fruits and games. timings keeps the seconds spent loading each asset.
+# Run this file to load everything and print the load times
+here = os.path.dirname(os.path.abspath(__file__))
+font_dir = os.path.join(here, 'Font')
+sound_dir = os.path.join(here, 'Sound')
+
+# Set by the game window: open the mixer when the first sound is asked for. Off-screen users leave
+# it off and get no sounds. The mixer runs in the format the asset pack holds its PCM in
+audio = False
+mixer_buffer = 512
+
+# Loaded assets and their load times, by key
+loaded = {}
+timings = {}
+
+def fetch(key, load):
+    asset = loaded.get(key)
+    if asset is None:
+        start = time.perf_counter()
+        asset = loaded[key] = load()
+        timings[key] = time.perf_counter() - start
+    return asset
+
+# {name: surface} for every sprite in Graphics at the given cell size, mapped from the asset pack
+# for that size when there is one and sliced from the atlas otherwise. Packs double as a disk cache
+# of the scaled sprites, with disk_cache off other sizes are scaled in memory on every run
+disk_cache = True
+
+def sprites(cell_size=atlas.cell_size):
+    def load():
+        if disk_cache or cell_size == atlas.cell_size:
+            sprites = pack.sprites(cell_size)
+            if sprites is not None:
+                return sprites
+        return atlas.load(size=cell_size)
+    return fetch(f'sprites {cell_size}', load)
+
+# Opening the audio device is slow, so it waits for the first sound. Returns whether the mixer runs
+def start_mixer():
+    global audio
+    if not pygame.mixer.get_init() and audio:
+        start = time.perf_counter()
+        try:
+            pygame.mixer.init(*pack.mixer_format, mixer_buffer)
+        except pygame.error:
+            # No audio device: carry on silently
+            audio = False
+        timings['mixer'] = time.perf_counter() - start
+    return pygame.mixer.get_init() is not None
+
+# None while there is no mixer, e.g. when rendering off-screen
+def sound(name):
+    if not start_mixer():
+        return None
+    def load():
+        sound = pack.sound(name)
+        if sound is None:
+            sound = pygame.mixer.Sound(os.path.join(sound_dir, name))
+        return sound
+    return fetch(f'sound {name}', load)
+
+def font(name, size):
+    return fetch(f'font {name} {size}', lambda: pygame.font.Font(os.path.join(font_dir, name), size))
+
+# Drop everything, e.g. after the display mode changed and surfaces need converting again
+def clear():
+    loaded.clear()
+    atlas.sheets.clear()
+    pack.packs.clear()
+    timings.clear()
+
+def report(file=sys.stdout):
+    for key, seconds in sorted(timings.items(), key=lambda item: -item[1]):
+        print(f'{seconds * 1000:8.2f} ms  {key}', file=file)
+    print(f'{sum(timings.values()) * 1000:8.2f} ms  total', file=file)
+
+
+if __name__ == '__main__':
+    pygame.display.init()
+    pygame.font.init()
+    audio = True
+    sprites()
+    font('PoetsenOne-Regular.ttf', 25)
+    sound('crunch.wav')
+    report()
+    sys.exit(0)
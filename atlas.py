@@ -0,0 +1,154 @@
+import glob, hashlib, json, math, os, sys, tempfile
+import pygame
+
+# Packs every Graphics/*.png into one sheet plus a JSON index of where each sprite sits, so startup
+# decodes a single image and the sprites are subsurfaces of it. load() rebuilds the sheet whenever
+# the source files no longer match the hashes in the index. The index also keeps the modification
+# time and size of each source, and while those are unchanged the sources are not even opened.
+# Run this file to rebuild by hand
+here = os.path.dirname(os.path.abspath(__file__))
+source_dir = os.path.join(here, 'Graphics')
+build_dir = os.path.join(here, 'build')
+image_path = os.path.join(build_dir, 'atlas.png')
+index_path = os.path.join(build_dir, 'atlas.json')
+version = 1
+# Side of a board cell the source sprites are drawn for
+cell_size = 40
+
+# Sheet surfaces already decoded or scaled in this process and their sprite rects, by index path and cell size
+sheets = {}
+
+def source_stats(source_dir=source_dir):
+    stats = {}
+    for path in sorted(glob.glob(os.path.join(source_dir, '*.png'))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        status = os.stat(path)
+        stats[name] = [status.st_mtime_ns, status.st_size]
+    return stats
+
+def source_hashes(source_dir=source_dir):
+    hashes = {}
+    for path in sorted(glob.glob(os.path.join(source_dir, '*.png'))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path, 'rb') as file:
+            hashes[name] = hashlib.sha1(file.read()).hexdigest()
+    return hashes
+
+# Shelf packing: tallest images first, rows filled left to right up to a roughly square width
+# rounded to whole widths of the widest image
+def pack(sizes):
+    widest = max(w for w, h in sizes.values())
+    width = widest * max(1, math.ceil(math.sqrt(sum(w * h for w, h in sizes.values())) / widest))
+    places = {}
+    x = y = shelf_height = 0
+    for name in sorted(sizes, key=lambda name: (-sizes[name][1], name)):
+        w, h = sizes[name]
+        if x + w > width:
+            x = 0
+            y += shelf_height
+            shelf_height = 0
+        places[name] = (x, y, w, h)
+        x += w
+        shelf_height = max(shelf_height, h)
+    return places, (width, y + shelf_height)
+
+# Write a file through a temporary one in the same directory and move it into place, so other
+# processes reading it only ever see a complete file, old or new
+def replace(path, write, suffix=''):
+    handle, temporary = tempfile.mkstemp(suffix=suffix, dir=os.path.dirname(path))
+    os.close(handle)
+    try:
+        os.chmod(temporary, 0o644)
+        write(temporary)
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+def build(source_dir=source_dir, image_path=image_path, index_path=index_path):
+    # Stats before hashes: a source changed in between shows as stale on the next start
+    stats = source_stats(source_dir)
+    hashes = source_hashes(source_dir)
+    images = {name: pygame.image.load(os.path.join(source_dir, name + '.png')) for name in hashes}
+    places, size = pack({name: image.get_size() for name, image in images.items()})
+    sheet = pygame.Surface(size, pygame.SRCALPHA)
+    for name, image in images.items():
+        # Max against the fully transparent sheet copies the pixels exactly, alpha included
+        sheet.blit(image, places[name][:2], special_flags=pygame.BLEND_RGBA_MAX)
+    index = {'version': version, 'image': os.path.basename(image_path), 'sources': hashes, 'stats': stats, 'sprites': places}
+    try:
+        os.makedirs(os.path.dirname(image_path), exist_ok=True)
+        # The index goes last, so no reader finds an index newer than the sheet next to it
+        replace(image_path, lambda path: pygame.image.save(sheet, path), '.png')
+        replace(index_path, lambda path: write_index(index, path))
+    except OSError:
+        # Read-only install: use the freshly built sheet for this run only
+        pass
+    return sheet, index
+
+# The sheet with every sprite smoothscaled on its own to the given cell size, keeping the layout
+# so neighbouring sprites never bleed into each other. Returns the sheet and the new rects
+def scale(sheet, sprites, size):
+    factor = size / cell_size
+    places = {name: [round(value * factor) for value in rect] for name, rect in sprites.items()}
+    scaled = pygame.Surface((round(sheet.get_width() * factor), round(sheet.get_height() * factor)), pygame.SRCALPHA)
+    for name, rect in sprites.items():
+        x, y, w, h = places[name]
+        image = pygame.transform.smoothscale(sheet.subsurface(rect), (w, h))
+        scaled.blit(image, (x, y), special_flags=pygame.BLEND_RGBA_MAX)
+    return scaled, places
+
+def write_index(index, path=index_path):
+    with open(path, 'w') as file:
+        json.dump(index, file, indent=1, sort_keys=True)
+
+def read_index(index_path=index_path):
+    try:
+        with open(index_path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+# Returns {name: subsurface} for every sprite, rebuilding the sheet first if it is missing or stale.
+# Sprites for another cell size come from a copy of the sheet scaled once per size
+def load(source_dir=source_dir, image_path=image_path, index_path=index_path, size=cell_size):
+    if (index_path, cell_size) not in sheets:
+        index = read_index(index_path)
+        sheet = None
+        if index is not None and index.get('version') != version:
+            index = None
+        if index is not None:
+            stats = source_stats(source_dir)
+            if index.get('stats') != stats:
+                if index['sources'] == source_hashes(source_dir):
+                    # Touched but not changed, e.g. by a checkout: keep the new stats for next time
+                    index['stats'] = stats
+                    try:
+                        replace(index_path, lambda path: write_index(index, path))
+                    except OSError:
+                        pass
+                else:
+                    index = None
+        if index is not None:
+            try:
+                sheet = pygame.image.load(image_path)
+            except (pygame.error, FileNotFoundError):
+                sheet = None
+        if sheet is None:
+            sheet, index = build(source_dir, image_path, index_path)
+        if pygame.display.get_surface() is not None:
+            sheet = sheet.convert_alpha()
+        sheets[index_path, cell_size] = (sheet, index['sprites'])
+    if (index_path, size) not in sheets:
+        sheet, sprites = scale(*sheets[index_path, cell_size], size)
+        if pygame.display.get_surface() is not None:
+            sheet = sheet.convert_alpha()
+        sheets[index_path, size] = (sheet, sprites)
+    sheet, sprites = sheets[index_path, size]
+    return {name: sheet.subsurface(rect) for name, rect in sprites.items()}
+
+
+if __name__ == '__main__':
+    sheet, index = build()
+    print(f'{len(index["sprites"])} sprites packed into {sheet.get_width()}x{sheet.get_height()} {image_path}')
+    sys.exit(0)
@@ -0,0 +1,83 @@
+import collections, sys, time
+import pygame
+import assets
+
+# Sounds played on a pool of reserved mixer channels. At most voices sounds play at once: when every
+# channel is busy the sound that started first is cut off for the new one, so eats fired in quick
+# succession at high speed never queue or get dropped. Low latency runs the mixer with a smaller
+# buffer and opens and warms it up front instead of on the first sound.
+# Latency is measured from the event to the play call, plus one mixer buffer of samples the device
+# still has to play before the new sound reaches it
+low_latency_buffer = 128
+
+class AUDIO:
+    def __init__(self, voices=4, low_latency=False):
+        self.voices = voices
+        self.low_latency = low_latency
+        self.channels = None
+        # perf_counter time each channel was last started, to find the oldest voice
+        self.started = [0.0] * voices
+        self.stolen = 0
+        self.latencies = collections.deque(maxlen=1000)
+
+# Open the mixer and reserve the channel pool, returns whether there is sound
+    def start(self):
+        if self.channels is None:
+            if self.low_latency and not pygame.mixer.get_init():
+                assets.mixer_buffer = low_latency_buffer
+            if not assets.start_mixer():
+                return False
+            if pygame.mixer.get_num_channels() < self.voices:
+                pygame.mixer.set_num_channels(self.voices)
+            # Sound.play and find_channel skip reserved channels, so nothing else takes the pool
+            pygame.mixer.set_reserved(self.voices)
+            self.channels = [pygame.mixer.Channel(index) for index in range(self.voices)]
+        return True
+
+# Open the mixer, decode the given sounds and run a moment of silence through the device so the
+# first real sound does not pay for any of it
+    def warm(self, names=()):
+        if self.start():
+            for name in names:
+                assets.sound(name)
+            frequency, size, channels = pygame.mixer.get_init()
+            silence = pygame.mixer.Sound(buffer=bytes(assets.mixer_buffer * abs(size) // 8 * channels))
+            self.channels[0].play(silence)
+
+    def play(self, name, event_time=None):
+        if event_time is None:
+            event_time = time.perf_counter()
+        if not self.start():
+            return None
+        sound = assets.sound(name)
+        if sound is None:
+            return None
+        index = self.free_voice()
+        channel = self.channels[index]
+        channel.play(sound)
+        now = time.perf_counter()
+        self.started[index] = now
+        self.latencies.append(now - event_time + self.buffer_seconds())
+        return channel
+
+# An idle channel of the pool, or the one whose sound started first, stopped
+    def free_voice(self):
+        for index, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                return index
+        index = min(range(self.voices), key=self.started.__getitem__)
+        self.channels[index].stop()
+        self.stolen += 1
+        return index
+
+    def buffer_seconds(self):
+        return assets.mixer_buffer / pygame.mixer.get_init()[0]
+
+    def report(self, file=sys.stdout):
+        if not self.latencies:
+            print('no sounds played', file=file)
+            return
+        latencies = sorted(self.latencies)
+        print(f'{len(latencies)} sounds, latency mean {sum(latencies) / len(latencies) * 1000:.2f} ms, '
+              f'worst {latencies[-1] * 1000:.2f} ms, buffer {self.buffer_seconds() * 1000:.2f} ms, '
+              f'{self.stolen} voices stolen', file=file)
@@ -0,0 +1,115 @@
+import numpy as np
+import engine
+
+# Many games held as numpy arrays (one row per game) and advanced together by a single step call.
+# The rules are the ones of engine.GAME and actions are indices into engine.ACTIONS
+STEP_X = np.array([direction.x for direction in engine.ACTIONS])
+STEP_Y = np.array([direction.y for direction in engine.ACTIONS])
+OPPOSITE = np.array([engine.ACTIONS.index(-direction) for direction in engine.ACTIONS])
+RIGHT = engine.ACTIONS.index(engine.RIGHT)
+
+class BATCH:
+    def __init__(self, count, cell_number=engine.cell_number, seed=None):
+        if cell_number < engine.min_cell_number:
+            raise ValueError(f'cell_number must be at least {engine.min_cell_number}, not {cell_number}')
+        self.count = count
+        self.cell_number = cell_number
+        self.rng = np.random.default_rng(seed)
+        cells = cell_number * cell_number
+        self.rows = np.arange(count)
+        # Ring buffer per game with the head at start, like engine.BODY
+        self.body = np.zeros((count, cells + 1), dtype=np.int32)
+        self.start = np.zeros(count, dtype=np.int64)
+        self.length = np.zeros(count, dtype=np.int64)
+        # Occupancy plane per game, number of segments on each cell
+        self.grid = np.zeros((count, cells), dtype=np.uint8)
+        self.direction = np.zeros(count, dtype=np.int64)
+        self.new_block = np.zeros(count, dtype=bool)
+        self.hit_wall = np.zeros(count, dtype=bool)
+        self.fruit = np.zeros(count, dtype=np.int64)
+        self.done = np.zeros(count, dtype=bool)
+        self.reset()
+
+# Restart the games selected by mask (all of them by default)
+    def reset(self, mask=None):
+        games = self.rows if mask is None else self.rows[mask]
+        row = self.cell_number // 2 * self.cell_number
+        self.grid[games] = 0
+        self.start[games] = 0
+        self.length[games] = 3
+        self.body[games, :3] = (row + 5, row + 4, row + 3)
+        self.grid[games, row + 3:row + 6] = 1
+        self.direction[games] = 0
+        self.new_block[games] = False
+        self.hit_wall[games] = False
+        self.done[games] = False
+        self.spawn_fruit(games)
+
+# Move the fruit of each given game to a uniformly chosen free cell, the fruit stays put on a full board
+    def spawn_fruit(self, games):
+        free = self.grid[games] == 0
+        counts = free.sum(axis=1)
+        has_room = counts > 0
+        games = games[has_room]
+        if len(games):
+            free = free[has_room]
+            pick = self.rng.integers(0, counts[has_room])
+            self.fruit[games] = np.argmax(np.cumsum(free, axis=1) > pick[:, None], axis=1)
+
+# Turn with the given actions (0 keeps the direction) and advance every running game by one tick.
+# Returns a bool array telling which games ate their fruit, finished games are flagged in done
+    def step(self, actions=None):
+        n = self.cell_number
+        capacity = self.body.shape[1]
+        eaten = np.zeros(self.count, dtype=bool)
+        live = self.rows[~self.done]
+
+        if actions is not None:
+            actions = np.broadcast_to(np.asarray(actions), (self.count,))[live]
+            # One turn per step, so the direction is also the last move once the snake is going.
+            # Before the first move the body lies as if it had just moved right, like engine.SNAKE
+            heading = np.where(self.direction[live] == 0, RIGHT, self.direction[live])
+            turn = (actions != 0) & (actions != OPPOSITE[heading])
+            self.direction[live[turn]] = actions[turn]
+
+        moving = live[self.direction[live] != 0]
+        direction = self.direction[moving]
+        head = self.body[moving, self.start[moving]]
+        x = head % n + STEP_X[direction]
+        y = head // n + STEP_Y[direction]
+        wall = (x < 0) | (x >= n) | (y < 0) | (y >= n)
+        self.done[moving[wall]] = True
+        # new_block stays set on these, score counts the growth like engine.GAME.score
+        self.hit_wall[moving[wall]] = True
+        moving = moving[~wall]
+        head = (y * n + x)[~wall]
+
+        shrink = moving[~self.new_block[moving]]
+        self.new_block[moving] = False
+        tail = self.body[shrink, (self.start[shrink] + self.length[shrink] - 1) % capacity]
+        self.grid[shrink, tail] -= 1
+        self.length[shrink] -= 1
+
+        self.start[moving] = (self.start[moving] - 1) % capacity
+        self.body[moving, self.start[moving]] = head
+        self.length[moving] += 1
+        self.grid[moving, head] += 1
+
+        ate = moving[head == self.fruit[moving]]
+        eaten[ate] = True
+        self.new_block[ate] = True
+        self.spawn_fruit(ate)
+
+        self.done[moving[self.grid[moving, head] > 1]] = True
+        # Nowhere left for the fruit: the snake has filled the board
+        self.done[moving[self.length[moving] >= n * n]] = True
+        return eaten
+
+    def score(self):
+        return self.length - 3 + (self.hit_wall & self.new_block)
+
+# Cells of one game's snake from head to tail, in the same packed form as engine.SNAKE.body
+    def snake(self, game):
+        capacity = self.body.shape[1]
+        index = (self.start[game] + np.arange(self.length[game])) % capacity
+        return self.body[game, index].tolist()
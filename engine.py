@@ -0,0 +1,317 @@
+import random
+
+# Pure game logic, no display or mixer: the window version in main.py draws on top of these classes
+cell_number = 20
+# The snake starts in columns 3 to 5 of the middle row, smaller boards can not hold it
+min_cell_number = 6
+
+# Cells are packed as y * cell_number + x and only turned into pixels when drawing
+
+class DIRECTION:
+    __slots__ = ('x', 'y')
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    def __neg__(self):
+        return DIRECTIONS[-self.x, -self.y]
+
+    def __iter__(self):
+        yield self.x
+        yield self.y
+
+    def __repr__(self):
+        return f'DIRECTION({self.x}, {self.y})'
+
+# The five directions are singletons, compare them with `is`
+NONE = DIRECTION(0,0)
+UP = DIRECTION(0,-1)
+RIGHT = DIRECTION(1,0)
+DOWN = DIRECTION(0,1)
+LEFT = DIRECTION(-1,0)
+# Directions by action number, as used by the batched engine and the bot interfaces
+ACTIONS = (NONE, UP, RIGHT, DOWN, LEFT)
+DIRECTIONS = {tuple(direction): direction for direction in ACTIONS}
+
+# Ring buffer holding the snake from head (index 0) to tail, sized for a snake filling the whole board
+# so pushing a head and popping the tail never copy or allocate
+class BODY:
+    def __init__(self, capacity):
+        self.cells = [None] * capacity
+        self.start = 0
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('body index out of range')
+        return self.cells[(self.start + index) % len(self.cells)]
+
+    def __setitem__(self, index, cell):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('body index out of range')
+        self.cells[(self.start + index) % len(self.cells)] = cell
+
+    def __iter__(self):
+        cells = self.cells
+        capacity = len(cells)
+        for index in range(self.start, self.start + self.length):
+            yield cells[index % capacity]
+
+    def push_head(self, cell):
+        self.start = (self.start - 1) % len(self.cells)
+        self.cells[self.start] = cell
+        self.length += 1
+
+    def pop_tail(self):
+        self.length -= 1
+        index = (self.start + self.length) % len(self.cells)
+        cell = self.cells[index]
+        self.cells[index] = None
+        return cell
+
+    def clear(self):
+        self.cells[:] = [None] * len(self.cells)
+        self.start = 0
+        self.length = 0
+
+    def snapshot(self):
+        return (self.cells[:], self.start, self.length)
+
+    def restore(self, state):
+        cells, self.start, self.length = state
+        self.cells[:] = cells
+
+
+# Set of grid indices with constant time add, remove and random choice: the members are packed
+# in a list and removal swaps the last member into the hole, position maps each index to its slot
+class CELLS:
+    def __init__(self, size):
+        self.cells = list(range(size))
+        self.position = list(range(size))
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, index):
+        return self.position[index] >= 0
+
+    def add(self, index):
+        if self.position[index] < 0:
+            self.position[index] = len(self.cells)
+            self.cells.append(index)
+
+    def remove(self, index):
+        position = self.position[index]
+        if position >= 0:
+            last = self.cells.pop()
+            if last != index:
+                self.cells[position] = last
+                self.position[last] = position
+            self.position[index] = -1
+
+    def choice(self, rng=random):
+        return self.cells[rng.randrange(len(self.cells))]
+
+    def reset(self):
+        size = len(self.position)
+        self.cells[:] = range(size)
+        self.position[:] = range(size)
+
+    def snapshot(self):
+        return (self.cells[:], self.position[:])
+
+    def restore(self, state):
+        cells, position = state
+        self.cells[:] = cells
+        self.position[:] = position
+
+
+class SNAKE:
+    def __init__(self, cell_number=cell_number):
+        self.cell_number = cell_number
+        self.body = BODY(cell_number * cell_number + 1)
+        # Number of segments on each board cell, kept in step with the body so lookups never scan it
+        self.grid = bytearray(cell_number * cell_number)
+        # Cells not covered by the snake, where the fruit is allowed to spawn
+        self.free = CELLS(cell_number * cell_number)
+        self.reset()
+
+#Move the snake by adding a new head in the direction of movement and removing the tail unless a new block is being added.
+#Running into a wall leaves the snake in place and raises hit_wall. A pending new block is kept,
+#the growth still counts towards the score, see GAME.score
+    def move_snake(self):
+        direction = self.direction
+        if direction is not NONE:
+            head = self.body[0]
+            x = head % self.cell_number + direction.x
+            y = head // self.cell_number + direction.y
+            if not 0 <= x < self.cell_number or not 0 <= y < self.cell_number:
+                self.hit_wall = True
+                return
+            if self.new_block:
+                self.new_block = False
+            else:
+                self.pop_tail()
+            self.push_head(y * self.cell_number + x)
+            self.last_direction = direction
+
+    def push_head(self, cell):
+        self.body.push_head(cell)
+        self.grid[cell] += 1
+        self.free.remove(cell)
+
+    def pop_tail(self):
+        cell = self.body.pop_tail()
+        self.grid[cell] -= 1
+        if not self.grid[cell]:
+            self.free.add(cell)
+
+    def occupies(self, cell):
+        return self.grid[cell] > 0
+
+    def bites_itself(self):
+        return self.grid[self.body[0]] > 1
+
+    def add_block(self):
+        self.new_block = True
+
+    def reset(self):
+        self.body.clear()
+        self.grid[:] = bytes(len(self.grid))
+        self.free.reset()
+        row = self.cell_number // 2 * self.cell_number
+        for block in (row + 3, row + 4, row + 5):
+            self.push_head(block)
+        self.direction = NONE
+        # Direction of the last move, which decides what counts as reversing. The starting body lies
+        # with the head rightmost, as if it had just moved right
+        self.last_direction = RIGHT
+        self.new_block = False
+        self.hit_wall = False
+
+    def snapshot(self):
+        return (self.body.snapshot(), bytes(self.grid), self.free.snapshot(), self.direction, self.last_direction, self.new_block, self.hit_wall)
+
+    def restore(self, state):
+        body, grid, free, self.direction, self.last_direction, self.new_block, self.hit_wall = state
+        self.body.restore(body)
+        self.grid[:] = grid
+        self.free.restore(free)
+
+
+class FRUIT:
+    def __init__(self, cell_number=cell_number, free=None, rng=None):
+        self.cell_number = cell_number
+        self.free = free
+        self.rng = rng if rng is not None else random.Random()
+        self.randomize()
+
+# Pick a cell from the free set when there is one so the fruit never lands on the snake.
+# A full board leaves the fruit where it is
+    def randomize(self):
+        if self.free is None:
+            self.x = self.rng.randint(0, self.cell_number - 1)
+            self.y = self.rng.randint(0, self.cell_number - 1)
+        elif self.free:
+            self.y, self.x = divmod(self.free.choice(self.rng), self.cell_number)
+        self.pos = self.y * self.cell_number + self.x
+
+    def snapshot(self):
+        return (self.x, self.y)
+
+    def restore(self, state):
+        self.x, self.y = state
+        self.pos = self.y * self.cell_number + self.x
+
+
+class GAME:
+    snake_type = SNAKE
+    fruit_type = FRUIT
+
+# Each game draws from its own RNG, so games sharing a process do not disturb each other
+# and the same seed always replays the same fruit positions
+    def __init__(self, cell_number=cell_number, seed=None):
+        if cell_number < min_cell_number:
+            raise ValueError(f'cell_number must be at least {min_cell_number}, not {cell_number}')
+        self.cell_number = cell_number
+        self.rng = random.Random(seed)
+        self.snake = self.snake_type(cell_number)
+        self.fruit = self.fruit_type(cell_number, self.snake.free, self.rng)
+        self.game_active = True
+        self.high_score = 0
+
+# Plain tuples of the whole game state, cheap to take and to put back, for bots that search ahead
+    def snapshot(self):
+        return (self.snake.snapshot(), self.fruit.snapshot(), self.rng.getstate(), self.game_active, self.high_score)
+
+    def restore(self, state):
+        snake, fruit, rng, self.game_active, self.high_score = state
+        self.snake.restore(snake)
+        self.fruit.restore(fruit)
+        self.rng.setstate(rng)
+
+# Advance the game by one tick, optionally turning first. Returns True when the fruit was eaten
+    def step(self, direction=None):
+        if direction is not None:
+            self.turn(direction)
+        return self.update()
+
+    def update(self):
+        if self.game_active:
+            self.snake.move_snake()
+            eaten = self.check_collision()
+            self.check_fail()
+            return eaten
+        return False
+
+# The snake can not reverse into its own neck and NONE keeps the current direction. Reversal is
+# judged against the last move rather than the pending direction, so two turns within one tick
+# can not fold the head back either. Any (x, y) pair is accepted as well as the constants
+    def turn(self, direction):
+        if not isinstance(direction, DIRECTION):
+            direction = DIRECTIONS[int(direction[0]), int(direction[1])]
+        if direction is not NONE and direction is not -self.snake.last_direction:
+            self.snake.direction = direction
+
+    def check_collision(self):
+        eaten = False
+        if self.fruit.pos == self.snake.body[0]:
+            self.fruit.randomize()
+            self.snake.add_block()
+            eaten = True
+        return eaten
+
+    def check_fail(self):
+        if self.snake.hit_wall:
+            self.game_over()
+        elif self.snake.bites_itself():
+            self.game_over()
+# Nowhere left for the fruit: the snake has filled the board
+        elif not self.snake.free:
+            self.game_over()
+
+# A snake that ate on the tick before running into the wall would have grown on its last move
+    def score(self):
+        return len(self.snake.body) - 3 + (self.snake.hit_wall and self.snake.new_block)
+
+    def game_over(self):
+
+        # Update high score in memory
+
+        current_score = self.score()
+        if current_score > self.high_score:
+            self.high_score = current_score
+        self.game_active = False
+
+    def restart_game(self):
+        self.snake.reset()
+        self.fruit.randomize()
+        self.game_active = True
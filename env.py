@@ -0,0 +1,99 @@
+import engine
+
+# Reset/step environment over the game rules for training and evaluating bots.
+# Actions are indices into engine.ACTIONS (0 keeps the current direction).
+# Observations are bytes with one cell per byte in packed order: EMPTY, BODY, HEAD or FRUIT
+EMPTY = 0
+BODY = 1
+HEAD = 2
+FRUIT = 3
+
+class SnakeEnv:
+    render_modes = (None, 'rgb_array', 'human')
+    render_fps = 60
+
+    def __init__(self, cell_number=engine.cell_number, render_mode=None):
+        if render_mode not in self.render_modes:
+            raise ValueError(f'render_mode must be one of {self.render_modes}, not {render_mode!r}')
+        self.cell_number = cell_number
+        self.render_mode = render_mode
+        self.game = None
+        self.screen = None
+        self.clock = None
+        self.steps = 0
+
+    def reset(self, seed=None):
+        if self.game is None:
+            self.game = self.make_game(seed)
+        else:
+            if seed is not None:
+                self.game.rng.seed(seed)
+            self.game.restart_game()
+        self.steps = 0
+        if self.render_mode == 'human':
+            self.render()
+        return self.observation(), self.info()
+
+# Returns observation, reward, terminated, info. Eating is worth 1 and dying -1. Stepping a finished
+# episode changes nothing and is worth 0 until reset
+    def step(self, action):
+        if not self.game.game_active:
+            return self.observation(), 0.0, True, self.info()
+        eaten = self.game.step(engine.ACTIONS[action])
+        terminated = not self.game.game_active
+        self.steps += 1
+        if eaten:
+            reward = 1.0
+        elif terminated:
+            reward = -1.0
+        else:
+            reward = 0.0
+        if self.render_mode == 'human':
+            self.render()
+        return self.observation(), reward, terminated, self.info()
+
+    def observation(self):
+        snake = self.game.snake
+        cells = bytearray(snake.grid)
+        cells[snake.body[0]] = HEAD
+        if cells[self.game.fruit.pos] == EMPTY:
+            cells[self.game.fruit.pos] = FRUIT
+        return bytes(cells)
+
+    def info(self):
+        return {'score': self.game.score(), 'length': len(self.game.snake.body), 'steps': self.steps}
+
+# pygame is only imported when rendering, render_mode None runs on the bare engine
+    def make_game(self, seed):
+        if self.render_mode is None:
+            return engine.GAME(self.cell_number, seed)
+        import pygame
+        import main
+        size = (self.cell_number * main.cell_size, self.cell_number * main.cell_size)
+        pygame.display.init()
+        pygame.font.init()
+        if self.render_mode == 'human':
+            self.screen = pygame.display.set_mode(size)
+            self.clock = pygame.time.Clock()
+        else:
+            self.screen = pygame.Surface(size)
+        return main.MAIN(self.cell_number, seed)
+
+# rgb_array returns a (height, width, 3) numpy array, human draws to the window
+    def render(self):
+        if self.render_mode is None:
+            return None
+        import pygame
+        self.game.draw_elements(self.screen)
+        if self.render_mode == 'rgb_array':
+            return pygame.surfarray.array3d(self.screen).swapaxes(0, 1)
+        pygame.event.pump()
+        pygame.display.update()
+        self.clock.tick(self.render_fps)
+        return None
+
+    def close(self):
+        if self.screen is not None:
+            import pygame
+            pygame.display.quit()
+            self.screen = None
@@ -1,254 +1,640 @@
-import pygame, sys, random
-from pygame.math import Vector2
+import time
+# Taken before the other imports, where --startup-profile starts counting
+started = time.perf_counter()
+import pygame, sys, math, argparse
+from collections import OrderedDict
+import engine, assets, audio
 
-class SNAKE:
-    def __init__(self):
-        self.reset()
-        # Graphics
-        self.head_up = pygame.image.load('Graphics/head_up.png').convert_alpha()
-        self.head_down = pygame.image.load('Graphics/head_down.png').convert_alpha()
-        self.head_right = pygame.image.load('Graphics/head_right.png').convert_alpha()
-        self.head_left = pygame.image.load('Graphics/head_left.png').convert_alpha()
+cell_size = 40
+cell_number = engine.cell_number
+
+# Plays the game's sounds, main() replaces it with one set up from the command line
+audio_manager = audio.AUDIO()
+
+# Pre-rendered board backgrounds, see MAIN.background
+backgrounds = {}
+
+# Rendered text surfaces by (text, antialias, color), the least recently used dropped beyond size.
+# Numbers are put together from cached digit glyphs, so a new score never goes through the rasterizer.
+# They are kept under ('#', text, antialias, color) apart from text rendered as a whole
+class TEXT_CACHE:
+    def __init__(self, font, size=128):
+        self.font = font
+        self.size = size
+        self.surfaces = OrderedDict()
+        self.glyphs = {}
+
+    def render(self, text, antialias, color):
+        key = (text, antialias, color)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.font.render(text, antialias, color)
+            self.remember(key, surface)
+        else:
+            self.surfaces.move_to_end(key)
+        return surface
+
+    def render_number(self, number, antialias, color):
+        text = str(number)
+        key = ('#', text, antialias, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        glyphs = []
+        x = 0
+        for digit in text:
+            glyph = self.glyphs.get((digit, antialias, color))
+            if glyph is None:
+                advance = self.font.metrics(digit)[0][4]
+                glyph = self.glyphs[digit, antialias, color] = (self.font.render(digit, antialias, color), advance)
+            glyphs.append((glyph[0], x))
+            x += glyph[1]
+        width = max(x + glyph.get_width() for glyph, x in glyphs)
+        surface = pygame.Surface((width, self.font.get_height()), pygame.SRCALPHA)
+        for glyph, x in glyphs:
+            # Max against the transparent surface copies each glyph as rendered, alpha included
+            surface.blit(glyph, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+        self.remember(key, surface)
+        return surface
+
+    def remember(self, key, surface):
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.size:
+            self.surfaces.popitem(last=False)
+
+def between(start, end, alpha):
+    return (round(start[0] + (end[0] - start[0]) * alpha), round(start[1] + (end[1] - start[1]) * alpha))
+
+def cell_rect(cell, cell_number):
+    y_index, x_index = divmod(cell, cell_number)
+    return pygame.Rect(x_index * cell_size, y_index * cell_size, cell_size, cell_size)
+
+class SNAKE(engine.SNAKE):
+    def __init__(self, cell_number=cell_number):
+        # Cells whose pixels changed since the last present, see MAIN.dirty_rects
+        self.dirty = set()
+        # Neighbours of a packed cell differ from it by 1 horizontally and by cell_number vertically,
+        # numbered 0 to 3 for up, right, down, left
+        self.neighbour = {-cell_number: 0, 1: 1, cell_number: 2, -1: 3}
+        # Body sprite number of each segment, parallel to body and set once when a segment stops being the head
+        self.shapes = engine.BODY(cell_number * cell_number + 1)
+        self.positions = [(cell % cell_number * cell_size, cell // cell_number * cell_size) for cell in range(cell_number * cell_number)]
+        self.areas = [pygame.Rect(position, (cell_size, cell_size)) for position in self.positions]
+        # Sprite currently shown on each board cell, patched as the snake moves so the board layer
+        # only has to redraw the cells that changed
+        self.cell_sprites = [None] * (cell_number * cell_number)
+        # Graphics at the current cell size, shared by every snake
+        sprites = assets.sprites(cell_size)
+        self.head_up = sprites['head_up']
+        self.head_down = sprites['head_down']
+        self.head_right = sprites['head_right']
+        self.head_left = sprites['head_left']
         
-        self.tail_up = pygame.image.load('Graphics/tail_up.png').convert_alpha()
-        self.tail_down = pygame.image.load('Graphics/tail_down.png').convert_alpha()
-        self.tail_right = pygame.image.load('Graphics/tail_right.png').convert_alpha()
-        self.tail_left = pygame.image.load('Graphics/tail_left.png').convert_alpha()
-
-        self.body_vertical = pygame.image.load('Graphics/body_vertical.png').convert_alpha()
-        self.body_horizontal = pygame.image.load('Graphics/body_horizontal.png').convert_alpha()
-
-        self.body_tr = pygame.image.load('Graphics/body_tr.png').convert_alpha()
-        self.body_tl = pygame.image.load('Graphics/body_tl.png').convert_alpha()
-        self.body_br = pygame.image.load('Graphics/body_br.png').convert_alpha()
-        self.body_bl = pygame.image.load('Graphics/body_bl.png').convert_alpha()
-        self.crunch_sound = pygame.mixer.Sound('Sound/crunch.wav')
-
-    def draw_snake(self):
+        self.tail_up = sprites['tail_up']
+        self.tail_down = sprites['tail_down']
+        self.tail_right = sprites['tail_right']
+        self.tail_left = sprites['tail_left']
+
+        self.body_vertical = sprites['body_vertical']
+        self.body_horizontal = sprites['body_horizontal']
+
+        self.body_tr = sprites['body_tr']
+        self.body_tl = sprites['body_tl']
+        self.body_br = sprites['body_br']
+        self.body_bl = sprites['body_bl']
+
+        # Head and tail sprites by the number of the neighbour they join, body sprites by
+        # previous * 4 + next neighbour. Both neighbours on the same side happen when the head doubles
+        # back over the neck and show as the straight piece along that axis
+        self.head_sprites = (self.head_down, self.head_left, self.head_up, self.head_right)
+        self.tail_sprites = (self.tail_down, self.tail_left, self.tail_up, self.tail_right)
+        self.body_sprites = [None] * 16
+        for previous_block, next_block, sprite in ((0, 2, self.body_vertical), (1, 3, self.body_horizontal),
+                                                   (3, 0, self.body_tl), (3, 2, self.body_bl),
+                                                   (1, 0, self.body_tr), (1, 2, self.body_br)):
+            self.body_sprites[previous_block * 4 + next_block] = sprite
+            self.body_sprites[next_block * 4 + previous_block] = sprite
+        for block, sprite in ((0, self.body_vertical), (1, self.body_horizontal), (2, self.body_vertical), (3, self.body_horizontal)):
+            self.body_sprites[block * 4 + block] = sprite
+        super().__init__(cell_number)
+
+    def draw_snake(self, screen):
         self.update_head_graphics()
         self.update_tail_graphics()
 
-#Draw each block of the snake with the appropriate sprite based on its position and relation to neighboring blocks
-        for index, block in enumerate(self.body):
-            x_pos = int(block.x * cell_size)
-            y_pos = int(block.y * cell_size)
-            block_rect = pygame.Rect(x_pos, y_pos, cell_size, cell_size)
-
-            if index == 0:
-                screen.blit(self.head, block_rect)
-            elif index == len(self.body) - 1:
-                screen.blit(self.tail, block_rect)
-            else:
-                previous_block = self.body[index + 1] - block
-                next_block = self.body[index - 1] - block
-                if previous_block.x == next_block.x:
-                    screen.blit(self.body_vertical, block_rect)
-                elif previous_block.y == next_block.y:
-                    screen.blit(self.body_horizontal, block_rect)
-                else:
-                    #Determine the correct corner sprite to use based on the location of the previous and next blocks
-                    if previous_block.x == -1 and next_block.y == -1 or previous_block.y == -1 and next_block.x == -1:
-                        screen.blit(self.body_tl, block_rect)
-                    elif previous_block.x == -1 and next_block.y == 1 or previous_block.y == 1 and next_block.x == -1:
-                        screen.blit(self.body_bl, block_rect)
-                    elif previous_block.x == 1 and next_block.y == -1 or previous_block.y == -1 and next_block.x == 1:
-                        screen.blit(self.body_tr, block_rect)
-                    elif previous_block.x == 1 and next_block.y == 1 or previous_block.y == 1 and next_block.x == 1:
-                        screen.blit(self.body_br, block_rect)
+#Draw each block of the snake with the sprite cached for it, the head and tail are picked fresh.
+#Everything goes to the surface in a single blits call
+        body_sprites = self.body_sprites
+        positions = self.positions
+        blocks = [(body_sprites[shape], positions[block]) for block, shape in zip(self.body, self.shapes)]
+        blocks[0] = (self.head, positions[self.body[0]])
+        blocks[-1] = (self.tail, positions[self.body[-1]])
+        screen.blits(blocks, doreturn=False)
 
 # Update head and tail graphics based on their relation to the next block in the body
     def update_head_graphics(self):
-        head_relation = self.body[1] - self.body[0]
-        if head_relation == Vector2(1,0): self.head = self.head_left
-        elif head_relation == Vector2(-1,0): self.head = self.head_right
-        elif head_relation == Vector2(0,1): self.head = self.head_up
-        elif head_relation == Vector2(0,-1): self.head = self.head_down
+        self.head = self.head_sprites[self.neighbour[self.body[1] - self.body[0]]]
 
     def update_tail_graphics(self):
-        tail_relation = self.body[-2] - self.body[-1]
-        if tail_relation == Vector2(1,0): self.tail = self.tail_left
-        elif tail_relation == Vector2(-1,0): self.tail = self.tail_right
-        elif tail_relation == Vector2(0,1): self.tail = self.tail_up
-        elif tail_relation == Vector2(0,-1): self.tail = self.tail_down
-
-#Move the snake by adding a new head in the direction of movement and removing the tail unless a new block is being added
-    def move_snake(self):
-        if self.direction != Vector2(0,0):
-            if self.new_block:
-                body_copy = self.body[:]
-                body_copy.insert(0, body_copy[0] + self.direction)
-                self.body = body_copy[:]
-                self.new_block = False
+        self.tail = self.tail_sprites[self.neighbour[self.body[-2] - self.body[-1]]]
+
+    def shape(self, block, previous_block, next_block):
+        return self.neighbour[previous_block - block] * 4 + self.neighbour[next_block - block]
+
+# A new head also turns the old head into a body segment (or the tail of a two block snake),
+# a popped tail turns the next segment into the tail
+    def push_head(self, cell):
+        # Biting into the body leaves that segment's sprite on top, as drawing in body order would
+        covered = self.grid[cell] > 0
+        if len(self.body):
+            old_head = self.body[0]
+            self.dirty.add(old_head)
+            if len(self.body) > 1:
+                self.shapes[0] = self.shape(old_head, self.body[1], cell)
+                self.cell_sprites[old_head] = self.body_sprites[self.shapes[0]]
             else:
-                body_copy = self.body[:-1]
-                body_copy.insert(0, body_copy[0] + self.direction)
-                self.body = body_copy[:]
-
-    def add_block(self):
-        self.new_block = True
-
-    def play_crunch_sound(self):
-        self.crunch_sound.play()
+                self.cell_sprites[old_head] = self.tail_sprites[self.neighbour[cell - old_head]]
+        super().push_head(cell)
+        self.shapes.push_head(0)
+        if not covered:
+            self.cell_sprites[cell] = self.head_sprites[self.neighbour[self.body[1] - cell]] if len(self.body) > 1 else None
+        self.dirty.add(cell)
+
+# Remember where the last move started from, for drawing in-between frames
+    def move_snake(self):
+        head = self.body[0]
+        self.previous_tail = None
+        super().move_snake()
+        self.moved = self.body[0] != head
+
+    def pop_tail(self):
+        tail = self.body[-1]
+        self.previous_tail = tail
+        self.dirty.add(tail)
+        super().pop_tail()
+        self.shapes.pop_tail()
+        if not self.grid[tail]:
+            self.cell_sprites[tail] = None
+        if len(self.body) > 1:
+            self.dirty.add(self.body[-1])
+            self.cell_sprites[self.body[-1]] = self.tail_sprites[self.neighbour[self.body[-2] - self.body[-1]]]
 
     def reset(self):
-        self.body = [Vector2(5,10), Vector2(4,10), Vector2(3,10)]
-        self.direction = Vector2(0,0)
-        self.new_block = False
+        self.shapes.clear()
+        self.cell_sprites[:] = [None] * len(self.cell_sprites)
+        super().reset()
+        self.moved = False
+        self.previous_tail = None
+
+    def restore(self, state):
+        super().restore(state)
+        self.moved = False
+        self.previous_tail = None
+        self.shapes.clear()
+        self.cell_sprites[:] = [None] * len(self.cell_sprites)
+        body = list(self.body)
+        for index in reversed(range(len(body))):
+            block = body[index]
+            if 0 < index < len(body) - 1:
+                self.shapes.push_head(self.shape(block, body[index + 1], body[index - 1]))
+                self.cell_sprites[block] = self.body_sprites[self.shapes[0]]
+            else:
+                self.shapes.push_head(0)
+        self.cell_sprites[body[-1]] = self.tail_sprites[self.neighbour[body[-2] - body[-1]]]
+        if self.cell_sprites[body[0]] is None:
+            self.cell_sprites[body[0]] = self.head_sprites[self.neighbour[body[1] - body[0]]]
 
+# The first crunch opens the mixer unless it was warmed up, no sound when there is none,
+# e.g. when rendering off-screen
+    def play_crunch_sound(self, event_time=None):
+        audio_manager.play('crunch.wav', event_time)
 
-class FRUIT:
-    def __init__(self):
-        self.randomize()
 
-    def draw_fruit(self):
-        fruit_rect = pygame.Rect(int(self.pos.x * cell_size), int(self.pos.y * cell_size), cell_size, cell_size)
-        screen.blit(apple, fruit_rect)
-        
-    def randomize(self):
-        self.x = random.randint(0, cell_number - 1)
-        self.y = random.randint(0, cell_number - 1)
-        self.pos = Vector2(self.x, self.y)
+class FRUIT(engine.FRUIT):
+    def __init__(self, cell_number=cell_number, free=None, rng=None):
+        self.dirty = set()
+        self.pos = None
+        super().__init__(cell_number, free, rng)
+        self.apple = assets.sprites(cell_size)['apple']
 
-class MAIN:
-    def __init__(self):
-        self.snake = SNAKE()
-        self.fruit = FRUIT()
-        self.game_active = True
-        self.high_score = 0 
+    def randomize(self):
+        if self.pos is not None:
+            self.dirty.add(self.pos)
+        super().randomize()
+        self.dirty.add(self.pos)
 
-    def update(self):
-        if self.game_active:
-            self.snake.move_snake()
-            self.check_collision()
-            self.check_fail()
-
-    def draw_elements(self):
-        self.draw_grass()
-        self.fruit.draw_fruit()
-        self.snake.draw_snake()
-        self.draw_score()
-        if not self.game_active:
-            self.draw_game_over_screen()
-
-    def check_collision(self):
-        if self.fruit.pos == self.snake.body[0]:
-            self.fruit.randomize()
-            self.snake.add_block()
-            self.snake.play_crunch_sound()
-# If the fruit spawns on the snake's body, randomize its position 
-        for block in self.snake.body[1:]:
-            if block == self.fruit.pos:
-                self.fruit.randomize()
-
-
-    def check_fail(self):
-        if not 0 <= self.snake.body[0].x < cell_number or not 0 <= self.snake.body[0].y < cell_number:
-            self.game_over()
-
-        for block in self.snake.body[1:]:
-            if block == self.snake.body[0]:
-                self.game_over()
+    def draw_fruit(self, screen):
+        screen.blit(self.apple, (self.x * cell_size, self.y * cell_size))
         
+class MAIN(engine.GAME):
+    snake_type = SNAKE
+    fruit_type = FRUIT
+    background_color = (175,215,70)
+    grass_color = (167,209,61)
+
+    def __init__(self, cell_number=cell_number, seed=None):
+        super().__init__(cell_number, seed)
+        self.game_font = assets.font('PoetsenOne-Regular.ttf', 25)
+        self.text = TEXT_CACHE(self.game_font)
+        self.full_redraw = True
+        # Background, fruit and snake drawn once and then patched cell by cell, see draw_board
+        self.board = None
+        self.patched = set()
+        # Cells the last smooth frame drew over the board layer, repainted from it on the next frame
+        self.motion_cells = set()
+        self.game_over_surface = None
+        # Bumped on every change that can show on screen, the loop skips frames while it stays the same
+        self.version = 0
+        self.score_rect = None
+        self.score_text = None
+        self.dirty_score = set()
+
+# Only a tick that moved the snake, moved the fruit or ended the game changes the picture,
+# idle ticks before the first key leave version alone
+    def update(self):
+        event_time = time.perf_counter()
+        active = self.game_active
+        fruit = self.fruit.pos
+        if super().update():
+            self.snake.play_crunch_sound(event_time)
+        if active and (self.snake.moved or self.fruit.pos != fruit or not self.game_active):
+            self.version += 1
+
+    def turn(self, direction):
+        previous = self.snake.direction
+        super().turn(direction)
+        if self.snake.direction is not previous:
+            self.version += 1
+
+# Overlays and jumps to a whole new state change the entire window
     def game_over(self):
-
-        # Update high score in memory
-
-        current_score = len(self.snake.body) - 3
-        if current_score > self.high_score:
-            self.high_score = current_score
-        self.game_active = False
+        super().game_over()
+        self.game_over_surface = None
+        self.full_redraw = True
 
     def restart_game(self):
-        self.snake.reset()
-        self.fruit.randomize()
-        self.game_active = True
-
-    def draw_grass(self):
-        grass_color = (167,209,61)
-        for row in range(cell_number):
-            for col in range(cell_number):
-                if (row + col) % 2 == 0:
-                    grass_rect = pygame.Rect(col * cell_size, row * cell_size, cell_size, cell_size)
-                    pygame.draw.rect(screen, grass_color, grass_rect)
+        super().restart_game()
+        self.board = None
+        self.game_over_surface = None
+        self.invalidate()
+
+    def restore(self, state):
+        super().restore(state)
+        self.board = None
+        self.game_over_surface = None
+        self.invalidate()
+
+    def invalidate(self):
+        self.full_redraw = True
+        self.version += 1
+
+# Screen rects changed since the last call, for pygame.display.update, or None when the whole window must be flipped
+    def dirty_rects(self):
+        cells = list(self.patched)
+        self.patched.clear()
+        score = [pygame.Rect(rect) for rect in self.dirty_score]
+        self.dirty_score.clear()
+        if self.full_redraw:
+            self.full_redraw = False
+            return None
+        return [cell_rect(cell, self.cell_number) for cell in cells] + score
+
+# Draw the whole board onto screen, which can be the window or any surface of the board's size.
+# Passing alpha, the fraction of the next tick already elapsed, draws the head and tail part way
+# along their last move
+    def draw_elements(self, screen, alpha=None):
+        if not self.game_active:
+            screen.blit(self.game_over_composition(), (0,0))
+            return
+        # Cells the last smooth frame drew over come back from the layer along with the changed ones
+        self.draw_board(screen, self.motion_cells, self.full_redraw)
+        self.motion_cells = set()
+        if alpha is not None:
+            self.draw_motion(screen, alpha)
+        self.draw_score(screen)
+
+# Over the board layer, clear the head cell and slide the head out of the neck. When the tail moved,
+# clear the cell it left, show its new cell as a body segment and slide the tail into it.
+# Only the cells touched here change between ticks
+    def draw_motion(self, screen, alpha):
+        snake = self.snake
+        if not snake.moved:
+            return
+        body = snake.body
+        positions = snake.positions
+        background = self.background()
+        head = body[0]
+        neck = body[1]
+        patches = [(background, positions[head], snake.areas[head])]
+        cells = [head, neck]
+        tail = snake.previous_tail
+        if tail is not None:
+            new_tail = body[-1]
+            patches.append((background, positions[tail], snake.areas[tail]))
+            if tail == self.fruit.pos:
+                patches.append((self.fruit.apple, positions[tail]))
+            patches.append((snake.body_sprites[snake.shape(new_tail, tail, body[-2])], positions[new_tail]))
+            patches.append((snake.tail_sprites[snake.neighbour[new_tail - tail]], between(positions[tail], positions[new_tail], alpha)))
+            cells += [tail, new_tail]
+        patches.append((snake.head_sprites[snake.neighbour[neck - head]], between(positions[neck], positions[head], alpha)))
+        screen.blits(patches, doreturn=False)
+        self.motion_cells.update(cells)
+        self.patched.update(cells)
+
+# The game over screen does not change until restart: board, score and overlay are put together once
+    def game_over_composition(self):
+        if self.game_over_surface is None:
+            surface = pygame.Surface((self.cell_number * cell_size, self.cell_number * cell_size))
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert()
+            self.draw_board(surface)
+            self.draw_score(surface)
+            self.draw_game_over_screen(surface)
+            self.game_over_surface = surface
+        return self.game_over_surface
+
+# Bring the board layer up to date by redrawing only the cells the snake and fruit touched,
+# so the cost per frame does not grow with the length of the snake
+    def draw_board(self, screen, repaint=(), full=True):
+        cells = self.snake.dirty | self.fruit.dirty
+        self.snake.dirty.clear()
+        self.fruit.dirty.clear()
+        if self.board is None:
+            self.board = pygame.Surface((self.cell_number * cell_size, self.cell_number * cell_size))
+            if pygame.display.get_surface() is not None:
+                self.board = self.board.convert()
+            self.draw_grass(self.board)
+            self.fruit.draw_fruit(self.board)
+            self.snake.draw_snake(self.board)
+            full = True
+        else:
+            background = self.background()
+            positions = self.snake.positions
+            areas = self.snake.areas
+            cell_sprites = self.snake.cell_sprites
+            patches = []
+            for cell in cells:
+                position = positions[cell]
+                patches.append((background, position, areas[cell]))
+                if cell == self.fruit.pos:
+                    patches.append((self.fruit.apple, position))
+                if cell_sprites[cell] is not None:
+                    patches.append((cell_sprites[cell], position))
+            self.board.blits(patches, doreturn=False)
+        cells.update(repaint)
+        self.patched |= cells
+        # Unless the whole window is redrawn, only the cells that changed are copied from the layer
+        if full:
+            screen.blit(self.board, (0,0))
+        else:
+            areas = self.snake.areas
+            screen.blits([(self.board, areas[cell], areas[cell]) for cell in cells], doreturn=False)
+
+    def draw_grass(self, screen):
+        screen.blit(self.background(), (0,0))
+
+# The fill and checkerboard never change, they are drawn once per board size, cell size and colors
+    def background(self):
+        key = (self.cell_number, cell_size, self.background_color, self.grass_color)
+        surface = backgrounds.get(key)
+        if surface is None:
+            surface = pygame.Surface((self.cell_number * cell_size, self.cell_number * cell_size))
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert()
+            surface.fill(self.background_color)
+            for row in range(self.cell_number):
+                for col in range(self.cell_number):
+                    if (row + col) % 2 == 0:
+                        grass_rect = pygame.Rect(col * cell_size, row * cell_size, cell_size, cell_size)
+                        pygame.draw.rect(surface, self.grass_color, grass_rect)
+            backgrounds[key] = surface
+        return surface
 
 #Display the current score 
-    def draw_score(self):
-        score_text = str(len(self.snake.body) - 3)
-        score_surface = game_font.render(score_text, True, (56,74,12))
-        score_x = int(cell_size * cell_number - 60)
-        score_y = int(cell_size * cell_number - 40)
+    def draw_score(self, screen):
+        apple = self.fruit.apple
+        score = self.score()
+        score_text = str(score)
+        score_surface = self.text.render_number(score, True, (56,74,12))
+        score_x = int(cell_size * self.cell_number - 60)
+        score_y = int(cell_size * self.cell_number - 40)
         score_rect = score_surface.get_rect(center = (score_x, score_y))
         apple_rect = apple.get_rect(midright = (score_rect.left, score_rect.centery))
         bg_rect = pygame.Rect(apple_rect.left, apple_rect.top, apple_rect.width + score_rect.width + 6, apple_rect.height)
+        box_rect = tuple(bg_rect.union(score_rect))
+        if box_rect != self.score_rect or score_text != self.score_text:
+            if self.score_rect is not None:
+                # The old box may stick out from under the new one, put the board back there
+                screen.blit(self.board, self.score_rect, self.score_rect)
+                self.dirty_score.add(self.score_rect)
+            self.dirty_score.add(box_rect)
+            self.score_rect = box_rect
+            self.score_text = score_text
 
         pygame.draw.rect(screen, (167,209,61), bg_rect)
-        screen.blit(score_surface, score_rect)
-        screen.blit(apple, apple_rect)
+        screen.blits(((score_surface, score_rect), (apple, apple_rect)), doreturn=False)
         pygame.draw.rect(screen, (56,74,12), bg_rect, 2)
 
-    def draw_game_over_screen(self):
+    def draw_game_over_screen(self, screen):
         # Background оverlay
-        overlay = pygame.Surface((cell_number * cell_size, cell_number * cell_size))
+        overlay = pygame.Surface((self.cell_number * cell_size, self.cell_number * cell_size))
         overlay.set_alpha(150)
         overlay.fill((0, 0, 0))
         screen.blit(overlay, (0,0))
 
         #Fonts and Scores
-        current_score = len(self.snake.body) - 3
+        current_score = self.score()
         
-        title_surf = game_font.render("GAME OVER!", True, (255, 255, 255))
-        score_surf = game_font.render(f"Score: {current_score}", True, (255, 255, 255))
-        high_surf = game_font.render(f"High Score: {self.high_score}", True, (255, 215, 0)) 
-        hint_surf = game_font.render("Press SPACE to Restart", True, (200, 200, 200))
+        title_surf = self.text.render("GAME OVER!", True, (255, 255, 255))
+        score_surf = self.text.render(f"Score: {current_score}", True, (255, 255, 255))
+        high_surf = self.text.render(f"High Score: {self.high_score}", True, (255, 215, 0)) 
+        hint_surf = self.text.render("Press SPACE to Restart", True, (200, 200, 200))
 
         #Center position
-        center_x = (cell_number * cell_size) // 2
-        center_y = (cell_number * cell_size) // 2
-
-        screen.blit(title_surf, title_surf.get_rect(center=(center_x, center_y - 60)))
-        screen.blit(score_surf, score_surf.get_rect(center=(center_x, center_y - 10)))
-        screen.blit(high_surf, high_surf.get_rect(center=(center_x, center_y + 30)))
-        screen.blit(hint_surf, hint_surf.get_rect(center=(center_x, center_y + 90)))
+        center_x = (self.cell_number * cell_size) // 2
+        center_y = (self.cell_number * cell_size) // 2
+
+        screen.blits((
+            (title_surf, title_surf.get_rect(center=(center_x, center_y - 60))),
+            (score_surf, score_surf.get_rect(center=(center_x, center_y - 10))),
+            (high_surf, high_surf.get_rect(center=(center_x, center_y + 30))),
+            (hint_surf, hint_surf.get_rect(center=(center_x, center_y + 90))),
+        ), doreturn=False)
+
+tick_ms = 90
+fps = 60
+
+# Fixed-timestep clock: real time, scaled by speed, fills an accumulator that is drained in whole
+# ticks, so the simulation rate does not depend on the frame rate. speed None runs unthrottled,
+# ticking for the whole frame budget. At most max_steps ticks run per frame, backlog beyond is dropped
+class TIMESTEP:
+    def __init__(self, tick_ms=tick_ms, speed=1.0, max_steps=None):
+        self.tick = tick_ms / 1000
+        self.speed = speed
+        if max_steps is None:
+            # Catch up at most a quarter second of play at this speed
+            max_steps = max(1, math.ceil((speed or 1.0) * 0.25 / self.tick))
+        self.max_steps = max_steps
+        self.reset()
 
-#Set sound settings 
-pygame.mixer.pre_init(44100, -16, 2, 512)
-pygame.init()
-cell_size = 40
-cell_number = 20
-screen = pygame.display.set_mode((cell_number * cell_size, cell_number * cell_size))
-clock = pygame.time.Clock()
-apple = pygame.image.load('Graphics/apple.png').convert_alpha()
-game_font = pygame.font.Font('Font/PoetsenOne-Regular.ttf', 25)
-
-SCREEN_UPDATE = pygame.USEREVENT
-pygame.time.set_timer(SCREEN_UPDATE, 90)
-
-main_game = MAIN()
-
-while True:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            sys.exit()
-        
-        if event.type == SCREEN_UPDATE:
+    def reset(self):
+        self.accumulator = 0.0
+        self.previous = time.perf_counter()
+
+# Run update for every tick that is due and return how many ran
+    def advance(self, update):
+        now = time.perf_counter()
+        elapsed = now - self.previous
+        self.previous = now
+        if self.speed is None:
+            deadline = now + 1 / fps
+            steps = 0
+            while time.perf_counter() < deadline:
+                update()
+                steps += 1
+            return steps
+
+        self.accumulator += elapsed * self.speed
+        steps = int(self.accumulator // self.tick)
+        if steps > self.max_steps:
+            steps = self.max_steps
+            self.accumulator %= self.tick
+        else:
+            self.accumulator -= steps * self.tick
+        for _ in range(steps):
+            update()
+        return steps
+
+# Fraction of the next tick already elapsed
+    def alpha(self):
+        return self.accumulator / self.tick
+
+# Wall-clock time of each startup phase, each measured from the end of the one before
+class STARTUP:
+    def __init__(self, start=started):
+        self.previous = start
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.previous))
+        self.previous = now
+
+    def report(self, file=sys.stderr):
+        for phase, seconds in self.phases:
+            print(f'{seconds * 1000:8.2f} ms  {phase}', file=file)
+        print(f'{sum(seconds for _, seconds in self.phases) * 1000:8.2f} ms  to first frame', file=file)
+        print('assets:', file=file)
+        assets.report(file)
+
+def parse_speed(value):
+    if value == 'max':
+        return None
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError('speed must be positive or max')
+    return speed
+
+def main(argv=None):
+    global cell_size, audio_manager
+    parser = argparse.ArgumentParser(description='Play snake')
+    parser.add_argument('--speed', type=parse_speed, default=1.0, help='simulation speed multiplier, or max for unthrottled')
+    parser.add_argument('--max-steps', type=int, default=None, help='most ticks simulated per frame when catching up')
+    parser.add_argument('--controller', default=None, help='let a bot play, see runner.py for the names')
+    parser.add_argument('--smooth', action='store_true', help='move the head and tail smoothly between ticks')
+    parser.add_argument('--cell-size', type=int, default=cell_size, help='pixels per board cell, sprites are scaled to fit')
+    parser.add_argument('--cell-number', type=int, default=cell_number, help='board cells per side')
+    parser.add_argument('--no-disk-cache', action='store_true', help='scale the sprites in memory instead of keeping them in build/')
+    parser.add_argument('--voices', type=int, default=4, help='most sounds playing at once, the oldest is cut off beyond')
+    parser.add_argument('--low-latency-audio', action='store_true', help='small mixer buffer, mixer opened and warmed at startup')
+    parser.add_argument('--audio-latency', action='store_true', help='print sound latency statistics on exit')
+    parser.add_argument('--startup-profile', action='store_true', help='print how long each startup phase took up to the first frame')
+    args = parser.parse_args(argv)
+    if args.cell_size < 1 or args.cell_number < engine.min_cell_number:
+        parser.error(f'--cell-size must be at least 1 and --cell-number at least {engine.min_cell_number}')
+    if args.voices < 1:
+        parser.error('--voices must be at least 1')
+    # Everything drawn reads the module's cell size, so set it before any sprite is loaded
+    cell_size = args.cell_size
+    assets.disk_cache = not args.no_disk_cache
+    startup = STARTUP()
+    startup.mark('imports')
+
+    # Only the subsystems the game uses, the mixer is opened by the first sound
+    pygame.display.init()
+    screen = pygame.display.set_mode((args.cell_number * cell_size, args.cell_number * cell_size))
+    startup.mark('display')
+    pygame.font.init()
+    startup.mark('font')
+    assets.audio = True
+    audio_manager = audio.AUDIO(args.voices, args.low_latency_audio)
+    if args.low_latency_audio:
+        audio_manager.warm(('crunch.wav',))
+        startup.mark('audio')
+    clock = pygame.time.Clock()
+    timestep = TIMESTEP(tick_ms, args.speed, args.max_steps)
+
+    main_game = MAIN(args.cell_number)
+    startup.mark('game')
+    drawn_version = None
+    if args.controller is None:
+        update = main_game.update
+    else:
+        import runner
+        controller = runner.load_controller(args.controller)
+        def update():
+            main_game.turn(controller(main_game))
             main_game.update()
+
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                if args.audio_latency:
+                    audio_manager.report()
+                pygame.quit()
+                sys.exit()
+
+            if event.type == pygame.WINDOWEXPOSED:
+                main_game.invalidate()
             
-        if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_SPACE and not main_game.game_active:
-                main_game.restart_game()
-
-            if main_game.game_active:
-                if event.key == pygame.K_UP or event.key == pygame.K_w  and main_game.snake.direction.y != 1:
-                    main_game.snake.direction = Vector2(0,-1)
-                if event.key == pygame.K_RIGHT  or event.key == pygame.K_d and main_game.snake.direction.x != -1:
-                    main_game.snake.direction = Vector2(1,0)
-                if event.key == pygame.K_DOWN or event.key == pygame.K_s and main_game.snake.direction.y != -1:
-                    main_game.snake.direction = Vector2(0,1)
-                if event.key == pygame.K_LEFT or event.key == pygame.K_a and main_game.snake.direction.x != 1:
-                    main_game.snake.direction = Vector2(-1,0)
-
-    screen.fill((175,215,70))
-    main_game.draw_elements()
-    pygame.display.update()
-    clock.tick(60)
\ No newline at end of file
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE and not main_game.game_active:
+                    main_game.restart_game()
+
+                if main_game.game_active:
+                    if event.key == pygame.K_UP or event.key == pygame.K_w:
+                        main_game.turn(engine.UP)
+                    if event.key == pygame.K_RIGHT or event.key == pygame.K_d:
+                        main_game.turn(engine.RIGHT)
+                    if event.key == pygame.K_DOWN or event.key == pygame.K_s:
+                        main_game.turn(engine.DOWN)
+                    if event.key == pygame.K_LEFT or event.key == pygame.K_a:
+                        main_game.turn(engine.LEFT)
+
+        # Game over stops the clock so a restart does not start with a burst of ticks
+        if main_game.game_active:
+            timestep.advance(update)
+        else:
+            timestep.reset()
+
+        # Nothing changed since the last frame: keep pumping events but leave the window alone
+        # Smooth motion changes the picture every frame while the game runs
+        smooth = args.smooth and main_game.game_active
+        if main_game.version != drawn_version or smooth:
+            main_game.draw_elements(screen, timestep.alpha() if smooth else None)
+            rects = main_game.dirty_rects()
+            if rects is None:
+                pygame.display.flip()
+            elif rects:
+                pygame.display.update(rects)
+            if drawn_version is None:
+                startup.mark('first frame')
+                if args.startup_profile:
+                    startup.report()
+            drawn_version = main_game.version
+        clock.tick(fps)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+import hashlib, json, mmap, os, struct, sys
+import pygame
+import atlas
+
+# The sprite sheet as raw pixels in the layout the display converts to, plus the sounds as PCM in
+# the mixer's format, in one file that is memory-mapped at startup. Surfaces are made over the
+# mapping with pygame.image.frombuffer, so nothing is decompressed or copied. Layout:
+#   magic, version and index length (header), the JSON index, then the blobs it points at
+# load() rebuilds the pack whenever the sources no longer match the hashes in the index. Like the
+# atlas, the index keeps each source's modification time and size, and while those are unchanged
+# the sources are not opened at all.
+# Packs for other cell sizes hold the sprites smoothscaled to that size, one file per size.
+# Run this file to rebuild by hand, optionally giving the cell sizes
+sound_dir = os.path.join(atlas.here, 'Sound')
+pack_path = os.path.join(atlas.build_dir, 'assets.pack')
+sounds = ('crunch.wav',)
+magic = b'SNAKEPAK'
+version = 2
+header = struct.Struct('<8sII')
+# Blobs start on this boundary so every row of pixels is aligned
+alignment = 64
+# Pixel order of a convert_alpha() surface on a little-endian ARGB8888 display
+pixel_format = 'BGRA'
+# Sound format the pack is built for, the one assets.start_mixer opens the mixer with
+mixer_format = (44100, -16, 2)
+
+def path(cell_size=atlas.cell_size):
+    if cell_size == atlas.cell_size:
+        return pack_path
+    return os.path.join(atlas.build_dir, f'assets-{cell_size}.pack')
+
+# Mapped packs in this process, by path: (mmap, index) or None when the pack could not be used
+packs = {}
+
+def source_stats(source_dir=atlas.source_dir, sound_dir=sound_dir):
+    stats = {'graphics': atlas.source_stats(source_dir)}
+    for name in sounds:
+        status = os.stat(os.path.join(sound_dir, name))
+        stats[name] = [status.st_mtime_ns, status.st_size]
+    return stats
+
+def source_hashes(source_dir=atlas.source_dir, sound_dir=sound_dir):
+    hashes = {'graphics': atlas.source_hashes(source_dir)}
+    for name in sounds:
+        with open(os.path.join(sound_dir, name), 'rb') as file:
+            hashes[name] = hashlib.sha1(file.read()).hexdigest()
+    return hashes
+
+def aligned(offset):
+    return -(-offset // alignment) * alignment
+
+# PCM for each sound, converted by a mixer opened in mixer_format. Sounds are left out of the
+# pack when no audio device can be opened
+def decode_sounds(sound_dir=sound_dir):
+    running = pygame.mixer.get_init()
+    if running is not None and running != mixer_format:
+        return {}
+    try:
+        if running is None:
+            pygame.mixer.init(*mixer_format)
+    except pygame.error:
+        return {}
+    try:
+        return {name: pygame.mixer.Sound(os.path.join(sound_dir, name)).get_raw() for name in sounds}
+    finally:
+        if running is None:
+            pygame.mixer.quit()
+
+def build(pack_path=pack_path, source_dir=atlas.source_dir, sound_dir=sound_dir, cell_size=atlas.cell_size):
+    sheet, atlas_index = atlas.build(source_dir)
+    sprites = atlas_index['sprites']
+    if cell_size != atlas.cell_size:
+        sheet, sprites = atlas.scale(sheet, sprites, cell_size)
+    blobs = [pygame.image.tobytes(sheet, pixel_format)]
+    index = {
+        'version': version,
+        'stats': source_stats(source_dir, sound_dir),
+        'sources': source_hashes(source_dir, sound_dir),
+        'cell_size': cell_size,
+        'sheet': {'size': sheet.get_size(), 'format': pixel_format},
+        'sprites': sprites,
+        'sounds': {},
+    }
+    pcm = decode_sounds(sound_dir)
+    for name in sounds:
+        if name in pcm:
+            index['sounds'][name] = {'format': mixer_format}
+            blobs.append(pcm[name])
+    write(pack_path, index, blobs)
+    return index
+
+# Lay out the blobs, the sheet first and then the sounds in index order, and write the pack
+def write(pack_path, index, blobs):
+    # Offsets depend on the index length, which depends on the offsets: lay the blobs out after
+    # a generous guess of the index size and grow the guess until it fits
+    room = alignment
+    while True:
+        offset = aligned(header.size + room)
+        entries = [index['sheet']] + [index['sounds'][name] for name in sounds if name in index['sounds']]
+        for entry, blob in zip(entries, blobs):
+            entry['offset'] = offset
+            entry['length'] = len(blob)
+            offset = aligned(offset + len(blob))
+        text = json.dumps(index, sort_keys=True).encode()
+        if header.size + len(text) <= aligned(header.size + room):
+            break
+        room *= 2
+    def write_file(path):
+        with open(path, 'wb') as file:
+            file.write(header.pack(magic, version, len(text)))
+            file.write(text)
+            for entry, blob in zip(entries, blobs):
+                file.write(bytes(entry['offset'] - file.tell()))
+                file.write(blob)
+    os.makedirs(os.path.dirname(pack_path), exist_ok=True)
+    # Other processes may have the old pack mapped: a new file is moved over it rather than
+    # rewriting it under them
+    atlas.replace(pack_path, write_file)
+
+def read(pack_path=pack_path):
+    try:
+        with open(pack_path, 'rb') as file:
+            # Copy on write: pages are shared with the file until something draws into a sprite
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+    except (OSError, ValueError):
+        return None
+    if len(data) < header.size:
+        return None
+    file_magic, file_version, length = header.unpack_from(data)
+    if file_magic != magic or file_version != version:
+        return None
+    try:
+        index = json.loads(data[header.size:header.size + length])
+    except ValueError:
+        return None
+    return data, index
+
+# Returns (mmap, index) of an up to date pack, building it first if needed, or None when there
+# is no usable pack, e.g. on a read-only install without one
+def load(pack_path=pack_path, source_dir=atlas.source_dir, sound_dir=sound_dir, cell_size=atlas.cell_size):
+    if pack_path not in packs:
+        packed = read(pack_path)
+        if packed is not None and packed[1]['cell_size'] != cell_size:
+            packed = None
+        if packed is not None:
+            data, index = packed
+            stats = source_stats(source_dir, sound_dir)
+            if index.get('stats') != stats:
+                if index['sources'] == source_hashes(source_dir, sound_dir):
+                    # Touched but not changed: write the same blobs again under the new stats
+                    index['stats'] = stats
+                    entries = [index['sheet']] + [index['sounds'][name] for name in sounds if name in index['sounds']]
+                    try:
+                        write(pack_path, index, [data[entry['offset']:entry['offset'] + entry['length']] for entry in entries])
+                        packed = read(pack_path)
+                    except OSError:
+                        # Offsets in the index may have moved with it, so the old mapping is not used
+                        packed = None
+                else:
+                    packed = None
+        if packed is None:
+            try:
+                build(pack_path, source_dir, sound_dir, cell_size)
+                packed = read(pack_path)
+            except OSError:
+                pass
+        packs[pack_path] = packed
+    return packs[pack_path]
+
+# {name: surface} for every sprite at the given cell size, like atlas.load, or None without a pack
+def sprites(cell_size=atlas.cell_size):
+    packed = load(path(cell_size), cell_size=cell_size)
+    if packed is None:
+        return None
+    data, index = packed
+    sheet = index['sheet']
+    pixels = memoryview(data)[sheet['offset']:sheet['offset'] + sheet['length']]
+    surface = pygame.image.frombuffer(pixels, sheet['size'], sheet['format'])
+    return {name: surface.subsurface(rect) for name, rect in index['sprites'].items()}
+
+# The named sound from its packed PCM, or None when the pack does not hold it in the format the
+# mixer is running with
+def sound(name, pack_path=pack_path):
+    packed = load(pack_path)
+    if packed is None or name not in packed[1]['sounds']:
+        return None
+    data, index = packed
+    entry = index['sounds'][name]
+    if pygame.mixer.get_init() != tuple(entry['format']):
+        return None
+    return pygame.mixer.Sound(buffer=memoryview(data)[entry['offset']:entry['offset'] + entry['length']])
+
+
+if __name__ == '__main__':
+    for cell_size in [int(size) for size in sys.argv[1:]] or [atlas.cell_size]:
+        index = build(path(cell_size), cell_size=cell_size)
+        print(f'{len(index["sprites"])} sprites and {len(index["sounds"])} sounds packed into {path(cell_size)}')
+    sys.exit(0)
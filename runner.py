@@ -0,0 +1,110 @@
+import argparse, importlib, random, sys, time
+from concurrent.futures import ProcessPoolExecutor
+import engine
+
+# Plays many headless games across a process pool and prints aggregated results, e.g.
+#   python runner.py --games 10000 --controller greedy
+# A controller is a function taking the engine.GAME and returning the direction for the next tick.
+# Besides the built-in names, any module:function importable by the workers can be given
+
+def random_controller(game):
+    return random.choice((engine.UP, engine.RIGHT, engine.DOWN, engine.LEFT))
+
+# Take the step that brings the head closest to the fruit without hitting a wall or the body
+def greedy_controller(game):
+    snake = game.snake
+    n = game.cell_number
+    head_y, head_x = divmod(snake.body[0], n)
+    fruit_y, fruit_x = divmod(game.fruit.pos, n)
+    options = sorted((engine.UP, engine.RIGHT, engine.DOWN, engine.LEFT),
+                     key=lambda d: abs(fruit_x - head_x - d.x) + abs(fruit_y - head_y - d.y))
+    for direction in options:
+        if direction is -snake.last_direction:
+            continue
+        x = head_x + direction.x
+        y = head_y + direction.y
+        if 0 <= x < n and 0 <= y < n and not snake.occupies(y * n + x):
+            return direction
+    return snake.direction
+
+controllers = {
+    'random': random_controller,
+    'greedy': greedy_controller,
+}
+
+def load_controller(name):
+    if name in controllers:
+        return controllers[name]
+    module, _, attribute = name.partition(':')
+    if not attribute:
+        raise ValueError(f'unknown controller {name!r}, use one of {sorted(controllers)} or module:function')
+    return getattr(importlib.import_module(module), attribute)
+
+# Worker entry point: one game per seed, each stopped at game over or after max_ticks
+def play_games(seeds, controller_name, cell_number, max_ticks):
+    controller = load_controller(controller_name)
+    results = []
+    for seed in seeds:
+        # The game has its own RNG, the random module is seeded as well for controllers that use it
+        random.seed(seed)
+        game = engine.GAME(cell_number, seed)
+        ticks = 0
+        while game.game_active and ticks < max_ticks:
+            game.step(controller(game))
+            ticks += 1
+        results.append((seed, game.score(), len(game.snake.body), ticks))
+    return results
+
+def run(games, controller_name, cell_number=engine.cell_number, max_ticks=100_000, workers=None, seed=0, chunk_size=64):
+    seeds = range(seed, seed + games)
+    chunks = [seeds[start:start + chunk_size] for start in range(0, games, chunk_size)]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(play_games, chunk, controller_name, cell_number, max_ticks) for chunk in chunks]
+        for future in futures:
+            results.extend(future.result())
+    return results
+
+def summarize(results, seconds):
+    scores = [score for _, score, _, _ in results]
+    lengths = [length for _, _, length, _ in results]
+    ticks = sum(tick for _, _, _, tick in results)
+    return {
+        'games': len(results),
+        'mean_score': sum(scores) / len(scores),
+        'min_score': min(scores),
+        'max_score': max(scores),
+        'mean_length': sum(lengths) / len(lengths),
+        'ticks': ticks,
+        'seconds': seconds,
+        'ticks_per_second': ticks / seconds if seconds else 0.0,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Play headless snake games in parallel and report the results')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--controller', default='greedy', help=f'one of {sorted(controllers)} or module:function')
+    parser.add_argument('--cell-number', type=int, default=engine.cell_number)
+    parser.add_argument('--max-ticks', type=int, default=100_000, help='stop a game after this many ticks')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, one per core by default')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game, the others follow on')
+    args = parser.parse_args(argv)
+    if args.games < 1:
+        parser.error('--games must be at least 1')
+    if args.cell_number < engine.min_cell_number:
+        parser.error(f'--cell-number must be at least {engine.min_cell_number}')
+    try:
+        load_controller(args.controller)
+    except (ValueError, ImportError, AttributeError) as error:
+        parser.error(str(error))
+
+    start = time.perf_counter()
+    results = run(args.games, args.controller, args.cell_number, args.max_ticks, args.workers, args.seed)
+    summary = summarize(results, time.perf_counter() - start)
+    for key, value in summary.items():
+        print(f'{key}: {value:.2f}' if isinstance(value, float) else f'{key}: {value}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
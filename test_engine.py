@@ -0,0 +1,19 @@
+import engine, batch
+
+# Eating on the tick before running into the wall still counts, as in the original game where the
+# snake grew on its last move and then died
+def test_eat_then_wall_keeps_the_point():
+    game = engine.GAME(seed=0)
+    game.fruit.restore((engine.cell_number - 1, engine.cell_number // 2))
+    while game.game_active:
+        game.step(engine.RIGHT)
+    assert game.snake.hit_wall
+    assert game.score() == 1
+    assert game.high_score == 1
+
+def test_batch_eat_then_wall_keeps_the_point():
+    games = batch.BATCH(1, seed=0)
+    games.fruit[0] = engine.cell_number // 2 * engine.cell_number + engine.cell_number - 1
+    while not games.done[0]:
+        games.step([engine.ACTIONS.index(engine.RIGHT)])
+    assert games.score()[0] == 1